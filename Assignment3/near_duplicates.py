@@ -0,0 +1,93 @@
+import hashlib
+import re
+from bs4 import BeautifulSoup
+
+FINGERPRINT_BITS = 64
+
+
+# Split the visible text of a page into lowercase word shingles
+def shingles(html, size=3):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(['script', 'style']):
+        tag.decompose()
+    words = re.findall(r'\w+', ' '.join(soup.stripped_strings).lower())
+    if len(words) < size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+# Compute the 64-bit SimHash of a page from its shingles, or None if it has no visible words
+def simhash(html):
+    page_shingles = shingles(html)
+    if not page_shingles:
+        return None
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in page_shingles:
+        # md5 keeps fingerprints stable across runs, unlike the salted built-in hash()
+        value = int.from_bytes(hashlib.md5(shingle.encode('utf-8')).digest()[:8], 'big')
+        for bit in range(FINGERPRINT_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+# Count the bits that differ between two fingerprints
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class DuplicateIndex:
+    """
+    Finds near-duplicate pages by the Hamming distance of their SimHash.
+
+    Fingerprints are split into max_distance + 1 bit bands. Two fingerprints
+    that differ in at most max_distance bits must agree on at least one band,
+    so only pages sharing a band with the new page are compared.
+    """
+    def __init__(self, max_distance=6):
+        self.max_distance = max_distance  # Largest Hamming distance treated as a duplicate
+        self.bands = max_distance + 1
+        self.band_width = FINGERPRINT_BITS // self.bands
+        self.buckets = [{} for _ in range(self.bands)]  # Band value -> URLs with that band
+        self.fingerprints = {}  # URL -> fingerprint
+        self.duplicates = {}  # Skipped URL -> URL of the page it duplicates
+
+    def band_values(self, fingerprint):
+        mask = (1 << self.band_width) - 1
+        return [fingerprint >> (band * self.band_width) & mask for band in range(self.bands)]
+
+    # Return the URL of an indexed page within max_distance of the fingerprint, if any
+    def find(self, fingerprint):
+        checked = set()
+        for band, value in enumerate(self.band_values(fingerprint)):
+            for url in self.buckets[band].get(value, []):
+                if url in checked:
+                    continue
+                checked.add(url)
+                if hamming_distance(fingerprint, self.fingerprints[url]) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, url, fingerprint):
+        self.fingerprints[url] = fingerprint
+        for band, value in enumerate(self.band_values(fingerprint)):
+            self.buckets[band].setdefault(value, []).append(url)
+
+    # Fingerprint a page; record it and return the original's URL if it is a near-duplicate
+    # Pages without visible words cannot be compared, so they are never reported or indexed
+    def check(self, url, html):
+        fingerprint = simhash(html)
+        if fingerprint is None:
+            return None
+        original = self.find(fingerprint)
+        if original is not None:
+            self.duplicates[url] = original
+            return original
+        self.add(url, fingerprint)
+        return None
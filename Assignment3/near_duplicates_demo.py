@@ -0,0 +1,74 @@
+import random
+import web_crawler_Q5 as crawler
+from near_duplicates import DuplicateIndex
+
+BASE_URL = 'https://www.cpp.edu/sci/computer-science/'
+
+WORDS = ("algorithm data structure compiler network security database query index search "
+         "retrieval student course lecture faculty research graduate program seminar project "
+         "machine learning vision robotics theory systems software engineering cloud storage "
+         "parallel distributed memory processor language semantics logic graph model").split()
+
+
+# Build an in-memory site of distinct pages plus print views and query-string variants of some of them
+def build_synthetic_site(pages=50, duplicate_rate=0.5, words_per_page=150, seed=0):
+    rng = random.Random(seed)
+    site = {}
+    originals = {}  # URL of each injected duplicate -> URL of the page it copies
+    urls = [f"{BASE_URL}page{i}.shtml" for i in range(pages)]
+
+    for i, url in enumerate(urls):
+        body = ' '.join(rng.choice(WORDS) for _ in range(words_per_page))
+        links = [urls[(i + step) % pages] for step in (1, 2, 7)]
+        variants = []
+        if rng.random() < duplicate_rate:
+            variants.append((f"{url}?print=1", "<p>Printer friendly version</p>"))
+            variants.append((f"{url}?session={rng.randint(1000, 9999)}",
+                             f"<p>Last updated {rng.randint(1, 28)} October</p>"))
+        anchors = ''.join(f'<a href="{link}">{link}</a>' for link in links + [v[0] for v in variants])
+
+        site[url] = f"<html><body><h1>Page {i}</h1><p>{body}</p>{anchors}</body></html>"
+        for variant_url, extra in variants:
+            site[variant_url] = f"<html><body><h1>Page {i}</h1>{extra}<p>{body}</p>{anchors}</body></html>"
+            originals[variant_url] = url
+    return site, originals
+
+
+# Crawl the synthetic site and return the URLs that were stored and the number of pages parsed
+def crawl_site(site, duplicate_index=None):
+    stored = []
+    parsed = [0]
+    retrieveHTML, storePage, parse = crawler.retrieveHTML, crawler.storePage, crawler.parse
+
+    def count_parse(html, base_url):
+        parsed[0] += 1
+        return parse(html, base_url)
+
+    # Serve pages from memory and keep them out of MongoDB
+    crawler.retrieveHTML = lambda url: site[url].encode('utf-8') if url in site else None
+    crawler.storePage = lambda url, html: stored.append(url)
+    crawler.parse = count_parse
+    try:
+        frontier = crawler.Frontier()
+        frontier.addURL(BASE_URL + 'page0.shtml')
+        crawler.crawlerThread(frontier, duplicate_index)
+    finally:
+        crawler.retrieveHTML, crawler.storePage, crawler.parse = retrieveHTML, storePage, parse
+    return stored, parsed[0]
+
+
+if __name__ == '__main__':
+    site, originals = build_synthetic_site()
+
+    baseline_stored, baseline_parsed = crawl_site(site)
+    duplicate_index = DuplicateIndex(max_distance=6)
+    dedup_stored, dedup_parsed = crawl_site(site, duplicate_index)
+
+    skipped = set(duplicate_index.duplicates)
+    injected = set(originals)
+    print(f"\nSynthetic site: {len(site)} pages, {len(injected)} injected near-duplicates")
+    print(f"Pages stored without detection: {len(baseline_stored)}, parsed: {baseline_parsed}")
+    print(f"Pages stored with detection:    {len(dedup_stored)}, parsed: {dedup_parsed}")
+    print(f"Pages saved: {len(baseline_stored) - len(dedup_stored)}")
+    print(f"Injected duplicates caught: {len(skipped & injected)} of {len(injected)}")
+    print(f"Distinct pages wrongly skipped: {len(skipped - injected)}")
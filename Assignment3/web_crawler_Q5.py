@@ -2,6 +2,7 @@ import urllib.request
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import pymongo
+from near_duplicates import DuplicateIndex
 
 # Connect to MongoDB
 client = pymongo.MongoClient("mongodb://localhost:27017/")
@@ -88,7 +89,8 @@ def flagTargetPage(url):
     print(f"Target page found: {url}")
 
 # Main crawling function that iterates through URLs in the frontier until the target is found
-def crawlerThread(frontier):
+# Pages found near-identical by duplicate_index are neither stored nor expanded
+def crawlerThread(frontier, duplicate_index=None):
     while not frontier.done():
         url = frontier.nextURL()
         if url is None:
@@ -96,8 +98,14 @@ def crawlerThread(frontier):
         print(f"Visiting: {url}")
         html = retrieveHTML(url)
         if html:
+            is_target = targetpage(html)  # Checked first so a false duplicate cannot hide the target
+            if not is_target and duplicate_index is not None:
+                original = duplicate_index.check(url, html)
+                if original is not None:
+                    print(f"Skipping near-duplicate: {url} (matches {original})")
+                    continue
             storePage(url, html)  # Store the HTML in MongoDB
-            if targetpage(html):  # Check if it’s the target page
+            if is_target:  # Check if it’s the target page
                 flagTargetPage(url)  # Flag the target page if found
                 frontier.clear_frontier()  # Stop further crawling
             else:
@@ -111,4 +119,6 @@ if __name__ == "__main__":
     start_url = 'https://www.cpp.edu/sci/computer-science/'
     frontier = Frontier()  # Create a new frontier for URLs
     frontier.addURL(start_url)  # Add the start URL to the frontier
-    crawlerThread(frontier)  # Start the crawler thread
+    duplicate_index = DuplicateIndex(max_distance=6)  # Skip pages within 6 of 64 SimHash bits
+    crawlerThread(frontier, duplicate_index)  # Start the crawler thread
+    print(f"Near-duplicate pages skipped: {len(duplicate_index.duplicates)}")
@@ -1,13 +1,18 @@
+import math
+import re
+import time
+import bson
 from pymongo import MongoClient
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from instrumentation import metrics, PHRASE, SCORE, TOKENISE, VECTORISE, DOCUMENTS_TOKENISED, QUERIES_SCORED
 
 class SearchEngine:
-    def __init__(self):
+    def __init__(self, terms_collection='terms', documents_collection='documents'):
         # Initialize MongoDB connection and collections
         db = self.connect_to_mongodb()
-        self.terms_collection = db['terms']  # Inverted index collection
-        self.documents_collection = db['documents']  # Documents collection
+        self.terms_collection = db[terms_collection]  # Inverted index collection
+        self.documents_collection = db[documents_collection]  # Documents collection
         self.term_id_counter = 0  # Counter for term IDs
         self.document_id_counter = 0  # Counter for document IDs
 
@@ -43,6 +48,18 @@ class SearchEngine:
         )
         self.document_id_counter += 1
 
+    def add_documents(self, document_contents):
+        """
+        Adds a batch of documents to the MongoDB collection in a single round trip.
+        """
+        if not document_contents:
+            return
+        batch = []
+        for document_content in document_contents:
+            batch.append({"_id": self.document_id_counter, "content": document_content})
+            self.document_id_counter += 1
+        self.documents_collection.insert_many(batch)
+
     def add_term(self, position, documents):
         """
         Adds a term to the inverted index with its position and document references.
@@ -64,10 +81,12 @@ class SearchEngine:
         """
         # Retrieve all documents from the MongoDB collection
         documents = [doc['content'] for doc in self.documents_collection.find()]
+        metrics.count(DOCUMENTS_TOKENISED, len(documents))
 
         # Generate TF-IDF vectors for documents using n-grams (unigrams, bigrams, trigrams)
         self.vectorizer = TfidfVectorizer(ngram_range=(1, 3))
-        tfidf_matrix = self.vectorizer.fit_transform(documents)
+        with metrics.timer(VECTORISE):
+            tfidf_matrix = self.vectorizer.fit_transform(documents)
 
         # Store the vocabulary and document vectors
         self.terms_vocabulary = self.vectorizer.vocabulary_
@@ -86,10 +105,12 @@ class SearchEngine:
             self.add_term(int(position), document_references)  # Ensure Python int
 
 
-    def rank_documents(self, query):
+    @metrics.timed(SCORE)
+    def score_documents(self, query):
         """
-        Ranks documents based on their relevance to the given query using cosine similarity.
+        Scores every document against the query using cosine similarity, best first.
         """
+        metrics.count(QUERIES_SCORED)
         # Transform the query using the existing vocabulary and TF-IDF weights
         query_vector = self.vectorizer.transform([query]).toarray()[0]
 
@@ -103,13 +124,204 @@ class SearchEngine:
 
         # Sort documents by similarity score in descending order
         document_scores.sort(key=lambda x: x[1], reverse=True)
+        return document_scores
+
+    def rank_documents(self, query):
+        """
+        Ranks documents based on their relevance to the given query using cosine similarity.
+        """
+        self.display_documents(self.score_documents(query))
 
-        # Display the ranked documents with non-zero similarity
+    def display_documents(self, document_scores):
+        """
+        Prints the content and score of each document with a non-zero score.
+        """
         for document_id, similarity_score in document_scores:
             if similarity_score > 0:
                 document = self.documents_collection.find_one({"_id": document_id})
                 print(f"\"{document['content']}\", {similarity_score}")
 
+@metrics.timed(TOKENISE)
+def tokenize(text):
+    """
+    Splits text into lowercase word tokens, keeping their order for positions.
+    """
+    return re.findall(r'\w+', text.lower())
+
+def encode_positions(positions):
+    """
+    Packs sorted term positions into bytes: the count, then the gaps between positions, as varints.
+    """
+    gaps = [position - previous for previous, position in zip([0] + positions, positions)]
+    encoded = bytearray()
+    for value in [len(positions)] + gaps:
+        while value >= 0x80:
+            encoded.append((value & 0x7F) | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+def decode_varints(encoded):
+    """
+    Yields the varints packed in encoded.
+    """
+    value = shift = 0
+    for byte in encoded:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+def decode_positions(encoded):
+    """
+    Unpacks term positions written by encode_positions.
+    """
+    varints = decode_varints(encoded)
+    next(varints)  # Skip the count
+    positions = []
+    position = 0
+    for gap in varints:
+        position += gap
+        positions.append(position)
+    return positions
+
+def term_frequency(encoded):
+    """
+    Reads the number of positions without unpacking them.
+    """
+    return next(decode_varints(encoded))
+
+def collection_footprint(collection):
+    """
+    Returns the number of entries in a collection and their total BSON size in bytes.
+    """
+    entries = 0
+    size = 0
+    for entry in collection.find():
+        entries += 1
+        size += len(bson.encode(entry))
+    return entries, size
+
+class PositionalSearchEngine(SearchEngine):
+    """
+    Search engine over a positional inverted index scored with BM25.
+
+    Each term is stored once with the positions it occurs at in every
+    document, delta-encoded as varints, instead of indexing every n-gram.
+    Exact phrases of any length are answered by intersecting positions.
+    """
+    def __init__(self, k1=1.2, b=0.75):
+        super().__init__('positional_terms', 'positional_documents')
+        self.k1 = k1  # Term frequency saturation
+        self.b = b  # Document length normalisation
+        self.postings = {}  # Term -> {document ID: encoded positions}
+        self.document_lengths = []  # Number of tokens in each document
+        self.average_document_length = 0.0
+
+    def add_term(self, position, documents):
+        """
+        Adds a term to the inverted index with its encoded positions in each document.
+        """
+        documents = {str(k): v for k, v in documents.items()}
+
+        self.terms_collection.insert_one(
+            {"_id": self.term_id_counter, "pos": int(position), "docs": documents}
+        )
+        self.term_id_counter += 1
+
+    def generate_inverted_index(self):
+        """
+        Creates a positional inverted index and precomputes document lengths for BM25.
+        """
+        positions = {}
+        self.document_lengths = []
+        for document in self.documents_collection.find().sort("_id", 1):
+            tokens = tokenize(document['content'])
+            self.document_lengths.append(len(tokens))
+            metrics.count(DOCUMENTS_TOKENISED)
+            for position, token in enumerate(tokens):
+                positions.setdefault(token, {}).setdefault(document['_id'], []).append(position)
+
+        self.average_document_length = sum(self.document_lengths) / max(len(self.document_lengths), 1)
+        self.terms_vocabulary = {term: position for position, term in enumerate(sorted(positions))}
+        self.postings = {
+            term: {document_id: encode_positions(term_positions)
+                   for document_id, term_positions in documents.items()}
+            for term, documents in positions.items()
+        }
+
+        # Insert the inverted index into the MongoDB collection
+        for term, position in self.terms_vocabulary.items():
+            self.add_term(position, self.postings[term])
+
+    def bm25(self, term, document_id, encoded):
+        """
+        Scores one term occurrence list in one document.
+        """
+        document_frequency = len(self.postings[term])
+        idf = math.log((self.document_id_counter - document_frequency + 0.5) / (document_frequency + 0.5) + 1)
+        frequency = term_frequency(encoded)
+        normalisation = 1 - self.b + self.b * self.document_lengths[document_id] / self.average_document_length
+        return idf * frequency * (self.k1 + 1) / (frequency + self.k1 * normalisation)
+
+    @metrics.timed(SCORE)
+    def score_documents(self, query, document_ids=None):
+        """
+        Scores documents containing any query term using BM25, best first.
+        """
+        metrics.count(QUERIES_SCORED)
+        scores = {}
+        for term in set(tokenize(query)):
+            for document_id, encoded in self.postings.get(term, {}).items():
+                if document_ids is None or document_id in document_ids:
+                    scores[document_id] = scores.get(document_id, 0.0) + self.bm25(term, document_id, encoded)
+
+        document_scores = [(document_id, round(score, 2)) for document_id, score in scores.items()]
+        document_scores.sort(key=lambda x: x[1], reverse=True)
+        return document_scores
+
+    @metrics.timed(PHRASE)
+    def match_phrase(self, phrase):
+        """
+        Returns the IDs of documents containing the exact phrase.
+        """
+        terms = tokenize(phrase)
+        if not terms or any(term not in self.postings for term in terms):
+            return set()
+
+        # Only documents containing every term can contain the phrase; start from the rarest term
+        candidates = set.intersection(*(set(self.postings[term]) for term in
+                                        sorted(set(terms), key=lambda term: len(self.postings[term]))))
+        matches = set()
+        for document_id in candidates:
+            starts = set(decode_positions(self.postings[terms[0]][document_id]))
+            for offset, term in enumerate(terms[1:], start=1):
+                positions = set(decode_positions(self.postings[term][document_id]))
+                starts = {start for start in starts if start + offset in positions}
+                if not starts:
+                    break
+            if starts:
+                matches.add(document_id)
+        return matches
+
+    def rank_phrase(self, phrase):
+        """
+        Ranks documents containing the exact phrase by the BM25 score of its terms.
+        """
+        self.display_documents(self.score_documents(phrase, self.match_phrase(phrase)))
+
+def time_queries(search, queries, repeats=200):
+    """
+    Returns the mean time in microseconds of running each query through search.
+    """
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - started) / (repeats * len(queries)) * 1e6
+
 if __name__ == '__main__':
     # Initialize the search engine
     search_engine = SearchEngine()
@@ -134,3 +346,28 @@ if __name__ == '__main__':
     search_engine.rank_documents("dizziness")  
     print("\nQuery: the medication")
     search_engine.rank_documents("the medication")  
+
+    # Build the positional BM25 index over the same documents
+    positional_engine = PositionalSearchEngine()
+    for document in search_engine.documents_collection.find().sort("_id", 1):
+        positional_engine.add_document(document['content'])
+    positional_engine.generate_inverted_index()
+
+    print("\nBM25 query: nausea and dizziness")
+    positional_engine.rank_documents("nausea and dizziness")
+    print("\nPhrase query: headache and nausea")
+    positional_engine.rank_phrase("headache and nausea")
+    print("\nPhrase query: caused a headache and nausea")
+    positional_engine.rank_phrase("caused a headache and nausea")
+
+    # Compare the size of the n-gram index with the positional index
+    ngram_terms, ngram_bytes = collection_footprint(search_engine.terms_collection)
+    positional_terms, positional_bytes = collection_footprint(positional_engine.terms_collection)
+    print(f"\nTF-IDF 1-3 gram index: {ngram_terms} terms, {ngram_bytes} bytes")
+    print(f"Positional index:      {positional_terms} terms, {positional_bytes} bytes")
+
+    # Compare query latency
+    queries = ["nausea and dizziness", "effects", "nausea was reported", "dizziness", "the medication"]
+    print(f"\nTF-IDF cosine: {time_queries(search_engine.score_documents, queries):.1f} us/query")
+    print(f"BM25:          {time_queries(positional_engine.score_documents, queries):.1f} us/query")
+    print(f"Phrase:        {time_queries(positional_engine.match_phrase, queries):.1f} us/query")
@@ -0,0 +1,309 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'Assignment2'))
+sys.path.insert(0, os.path.join(ROOT, 'Assignment3'))
+
+import db_connection_mongo_solution as assignment2
+import web_crawler_Q5 as crawler
+from near_duplicates_demo import build_synthetic_site, BASE_URL
+from Q5_invertedIndex import SearchEngine, PositionalSearchEngine
+from crawl_index_pipeline import CrawlIndexPipeline
+from instrumentation import metrics, compare, DB, FETCH, PARSE, TOKENISE, DB_ROUND_TRIPS, PAGES_FETCHED
+
+DEFAULT_SCALES = [25, 100, 400]
+
+
+class Cursor(list):
+    def sort(self, key, direction=1):
+        return Cursor(sorted(self, key=lambda document: document[key], reverse=direction < 0))
+
+    def limit(self, count):
+        return Cursor(self[:count]) if count else self
+
+
+class UpdateResult:
+    def __init__(self, count):
+        self.matched_count = count
+        self.deleted_count = count
+
+
+class MemoryCollection:
+    """
+    In-memory stand-in for the parts of a pymongo collection the project uses.
+    Every call is timed as one DB round trip.
+    """
+    def __init__(self):
+        self.documents = []
+
+    def round_trip(self):
+        metrics.count(DB_ROUND_TRIPS)
+        return metrics.timer(DB)
+
+    def matches(self, document, query):
+        for key, condition in query.items():
+            if isinstance(condition, dict) and '$gt' in condition:
+                if key not in document or not document[key] > condition['$gt']:
+                    return False
+            elif document.get(key) != condition:
+                return False
+        return True
+
+    def insert_one(self, document):
+        with self.round_trip():
+            document.setdefault('_id', len(self.documents))
+            self.documents.append(document)
+
+    def insert_many(self, documents):
+        with self.round_trip():
+            for document in documents:
+                document.setdefault('_id', len(self.documents))
+                self.documents.append(document)
+
+    def find(self, query=None):
+        with self.round_trip():
+            return Cursor(document for document in self.documents if self.matches(document, query or {}))
+
+    def find_one(self, query):
+        with self.round_trip():
+            for document in self.documents:
+                if self.matches(document, query):
+                    return document
+            return None
+
+    def update_one(self, query, update):
+        with self.round_trip():
+            for document in self.documents:
+                if self.matches(document, query):
+                    document.update(update.get('$set', {}))
+                    return UpdateResult(1)
+            return UpdateResult(0)
+
+    def delete_one(self, query):
+        with self.round_trip():
+            for index, document in enumerate(self.documents):
+                if self.matches(document, query):
+                    del self.documents[index]
+                    return UpdateResult(1)
+            return UpdateResult(0)
+
+    def delete_many(self, query):
+        with self.round_trip():
+            remaining = [document for document in self.documents if not self.matches(document, query)]
+            deleted = len(self.documents) - len(remaining)
+            self.documents = remaining
+            return UpdateResult(deleted)
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+
+class MemoryDatabase(dict):
+    """
+    In-memory stand-in for a pymongo database; collections are created on first use.
+    """
+    def __missing__(self, name):
+        self[name] = MemoryCollection()
+        return self[name]
+
+
+# Point the search engines and the crawler at a fresh in-memory database
+def use_memory_database():
+    database = MemoryDatabase()
+    SearchEngine.connect_to_mongodb = lambda self: database
+    crawler.pages_collection = database['pages']
+    return database
+
+
+# Generate documents whose word frequencies follow Zipf's law, like natural text
+def generate_corpus(documents, words_per_document=30, vocabulary_size=2000, seed=0):
+    rng = random.Random(seed)
+    syllables = ['ka', 'to', 'ri', 'ne', 'mu', 'sa', 'lo', 'pe', 'di', 'va', 'ch', 'or']
+    vocabulary = sorted({''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+                         for _ in range(vocabulary_size)})
+    rng.shuffle(vocabulary)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [' '.join(rng.choices(vocabulary, weights, k=words_per_document)) for _ in range(documents)]
+
+
+# Pick short queries from the corpus so that every query matches something
+def generate_queries(corpus, count=5, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(corpus).split()
+        start = rng.randrange(len(words) - 1)
+        queries.append(' '.join(words[start:start + 2]))
+    return queries
+
+
+def bench_indexing(scale):
+    corpus = generate_corpus(scale)
+    directory = tempfile.TemporaryDirectory()  # Removed when the returned callable is discarded
+    with open(os.path.join(directory.name, 'collection.csv'), 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Document'])
+        for document in corpus:
+            writer.writerow([document])
+
+    def measured():
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        try:
+            runpy.run_path(os.path.join(ROOT, 'Assignment1', 'indexing.py'))
+        finally:
+            os.chdir(cwd)
+    return measured
+
+
+def bench_get_index(scale):
+    database = use_memory_database()
+    collection = database['documents']
+    for document_id, text in enumerate(generate_corpus(scale)):
+        assignment2.createDocument(collection, document_id, text, f"doc{document_id}", '2024-01-01', 'synthetic')
+    return lambda: assignment2.getIndex(collection)
+
+
+def bench_generate_inverted_index(scale):
+    use_memory_database()
+    search_engine = SearchEngine()
+    search_engine.add_documents(generate_corpus(scale))
+    return search_engine.generate_inverted_index
+
+
+def bench_rank_documents(scale, engine_class=SearchEngine):
+    use_memory_database()
+    corpus = generate_corpus(scale)
+    search_engine = engine_class()
+    search_engine.add_documents(corpus)
+    search_engine.generate_inverted_index()
+    queries = generate_queries(corpus)
+
+    def measured():
+        for query in queries:
+            search_engine.rank_documents(query)
+    return measured
+
+
+def bench_rank_documents_bm25(scale):
+    return bench_rank_documents(scale, PositionalSearchEngine)
+
+
+def bench_crawler_thread(scale):
+    use_memory_database()
+    site, _ = build_synthetic_site(pages=scale, duplicate_rate=0)
+
+    @metrics.timed(FETCH)
+    def retrieveHTML(url):
+        metrics.count(PAGES_FETCHED)
+        return site[url].encode('utf-8') if url in site else None
+
+    crawler.retrieveHTML = retrieveHTML
+    frontier = crawler.Frontier()
+    frontier.addURL(BASE_URL + 'page0.shtml')
+    return lambda: crawler.crawlerThread(frontier)
+
+
+def bench_crawl_index_pipeline(scale):
+    database = use_memory_database()
+    site, _ = build_synthetic_site(pages=scale, duplicate_rate=0)
+    database['pages'].insert_many([{'url': url, 'html': html} for url, html in site.items()])
+    # The BM25 engine keeps memory flat; SearchEngine's dense TF-IDF matrix would dominate at larger scales
+    pipeline = CrawlIndexPipeline(PositionalSearchEngine(), database['pages'], poll_interval=0, idle_timeout=0)
+    return pipeline.run
+
+
+# Benchmark name -> setup function that prepares the inputs and returns the callable to time
+BENCHMARKS = {
+    'indexing': bench_indexing,
+    'getIndex': bench_get_index,
+    'generate_inverted_index': bench_generate_inverted_index,
+    'rank_documents': bench_rank_documents,
+    'rank_documents_bm25': bench_rank_documents_bm25,
+    'crawlerThread': bench_crawler_thread,
+    'crawl_index_pipeline': bench_crawl_index_pipeline,
+}
+
+
+# Time the functions inside the Assignment scripts, which cannot import the instrumentation themselves
+def instrument_scripts():
+    metrics.wrap(assignment2, 'clean_text', TOKENISE)
+    metrics.wrap(crawler, 'parse', PARSE)
+    metrics.wrap(crawler, 'targetpage', PARSE)
+
+
+def run_benchmarks(names, scales, repeat):
+    """
+    Runs each benchmark at each scale, keeping the fastest of repeat runs and its metrics.
+    Only the measured phase is timed; corpus generation and index building for queries are not.
+    """
+    results = {}
+    for name in names:
+        results[name] = {}
+        for scale in scales:
+            best = None
+            for _ in range(repeat):
+                with contextlib.redirect_stdout(io.StringIO()):  # The benchmarked code prints its results
+                    measured = BENCHMARKS[name](scale)
+                    metrics.reset()  # Leave setup out of the metrics as well as the timing
+                    started = time.perf_counter()
+                    measured()
+                    seconds = time.perf_counter() - started
+                if best is None or seconds < best['seconds']:
+                    best = {'seconds': seconds, 'metrics': metrics.snapshot()}
+            results[name][str(scale)] = best
+            print(f"{name:<26}{scale:>8}{best['seconds']:>12.4f}")
+    return results
+
+
+# Flatten results to "benchmark@scale" and "benchmark@scale:timer" -> seconds for comparison
+def flatten(results):
+    timings = {}
+    for name, scales in results.items():
+        for scale, result in scales.items():
+            timings[f"{name}@{scale}"] = result['seconds']
+            for timer, values in result['metrics']['timers'].items():
+                timings[f"{name}@{scale}:{timer}"] = values['seconds']
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the indexer, search engine and crawler.")
+    parser.add_argument('--benchmarks', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--scales', nargs='+', type=int, default=DEFAULT_SCALES,
+                        help="documents or pages per run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scale; the fastest is kept")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="report regressions against results saved with --output")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="fractional slowdown allowed before a timing counts as a regression")
+    args = parser.parse_args()
+
+    metrics.enable()
+    instrument_scripts()
+    print(f"{'Benchmark':<26}{'Scale':>8}{'Seconds':>12}")
+    results = run_benchmarks(args.benchmarks, args.scales, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(flatten(baseline), flatten(results), args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} against {args.compare}")
+        for name, previous, seconds in regressions:
+            print(f"{name:<50}{previous:>12.4f}{seconds:>12.4f}{seconds / previous - 1:>+10.0%}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,292 @@
+import queue
+import threading
+import time
+from bs4 import BeautifulSoup, Comment
+from pymongo import MongoClient
+from Q5_invertedIndex import SearchEngine
+from instrumentation import metrics, PARSE, PAGES_FETCHED
+
+# Tags whose text is never shown to a reader or is repeated on every page of the site
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'template', 'iframe',
+                    'head', 'header', 'footer', 'nav', 'aside', 'form']
+
+# Marker placed on a queue to tell the next stage that no more items will arrive
+_DONE = object()
+
+
+# Connect to the crawler database written by Assignment3/web_crawler_Q5.py
+def connectCrawlerDataBase():
+    DB_NAME = "crawlerdb"
+    DB_HOST = "localhost"
+    DB_PORT = 27017
+    try:
+        client = MongoClient(host=DB_HOST, port=DB_PORT)
+        db = client[DB_NAME]
+        return db
+    except:
+        print("Database connection failed.")
+
+
+# Extract the visible text of a page, dropping scripts, navigation and other boilerplate
+@metrics.timed(PARSE)
+def extract_text(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return ' '.join(soup.stripped_strings)
+
+
+class StageStats:
+    """
+    Counts the items a pipeline stage handled, the time it spent working and
+    the deepest its input queue got.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.items = 0  # Items passed on to the next stage
+        self.busy_seconds = 0.0  # Time spent working, excluding waits on queues
+        self.max_queue_depth = 0  # Deepest the input queue has been
+        self.lock = threading.Lock()
+
+    def record(self, items, seconds):
+        with self.lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def observe_queue(self, depth):
+        with self.lock:
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+
+    def throughput(self):
+        """
+        Items handled per second of busy time.
+        """
+        with self.lock:
+            if self.busy_seconds == 0:
+                return 0.0
+            return self.items / self.busy_seconds
+
+
+class CrawlIndexPipeline:
+    """
+    Streams crawled pages from crawlerdb.pages into a SearchEngine.
+
+    Three threads run the fetch, extract and index stages. They are joined by
+    bounded queues, so a slow stage blocks the one before it instead of letting
+    pages pile up in memory. The fetch stage keeps polling for new pages, which
+    lets it run alongside the crawler; it stops once stop() is called or no new
+    page has appeared for idle_timeout seconds. When every stage has drained,
+    the inverted index is regenerated over all indexed documents.
+
+    If a stage raises, the other stages stop taking on work but keep passing
+    the end marker along and draining their queues, so run() can still return
+    and re-raise the first error.
+    """
+    def __init__(self, search_engine, pages_collection, batch_size=20, queue_size=100,
+                 poll_interval=1.0, idle_timeout=10.0, report_interval=None):
+        self.search_engine = search_engine
+        self.pages_collection = pages_collection
+        self.batch_size = batch_size  # Documents sent to the index per insert
+        self.queue_size = queue_size  # Also the most pages read from the database per poll
+        self.poll_interval = poll_interval  # Seconds between polls when no new pages exist
+        self.idle_timeout = idle_timeout  # Seconds without new pages before fetching stops
+        self.report_interval = report_interval  # Seconds between reports while running, None for none
+
+        # Bounded queues between the stages provide the backpressure
+        self.html_queue = queue.Queue(maxsize=queue_size)
+        self.text_queue = queue.Queue(maxsize=queue_size)
+
+        self.stats = {
+            'fetch': StageStats('fetch'),
+            'extract': StageStats('extract'),
+            'index': StageStats('index'),
+        }
+        self.stop_event = threading.Event()
+        self.finished_event = threading.Event()  # Set once every stage has returned
+        self.errors = []  # Exceptions raised by the stages, first one re-raised by run()
+        self.last_page_id = None  # _id of the newest page already fetched
+
+    def fail(self, error):
+        """
+        Records a stage's exception and tells the fetch stage to stop.
+        """
+        self.errors.append(error)
+        self.stop_event.set()
+
+    def drain(self, stage_queue):
+        """
+        Discards items until the upstream stage's end marker, so it never blocks on a full queue.
+        """
+        while stage_queue.get() is not _DONE:
+            pass
+
+    def fetch_stage(self):
+        """
+        Pulls pages newer than the last one seen and queues their HTML.
+        Each poll reads at most queue_size pages, one at a time from the cursor,
+        so no more pages are held in memory than the queue can take.
+        """
+        stats = self.stats['fetch']
+        last_seen = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                # Busy time covers the query and reading the cursor, but not waiting on the queue
+                started = time.perf_counter()
+                page_filter = {} if self.last_page_id is None else {'_id': {'$gt': self.last_page_id}}
+                cursor = iter(self.pages_collection.find(page_filter).sort('_id', 1).limit(self.queue_size))
+                busy_seconds = time.perf_counter() - started
+                fetched = 0
+                while not self.stop_event.is_set():
+                    started = time.perf_counter()
+                    page = next(cursor, None)
+                    busy_seconds += time.perf_counter() - started
+                    if page is None:
+                        break
+                    self.html_queue.put((page['url'], page['html']))  # Blocks while extract is behind
+                    self.last_page_id = page['_id']
+                    fetched += 1
+                    self.stats['extract'].observe_queue(self.html_queue.qsize())
+                stats.record(fetched, busy_seconds)
+                metrics.count(PAGES_FETCHED, fetched)
+
+                if fetched:
+                    last_seen = time.monotonic()
+                elif time.monotonic() - last_seen >= self.idle_timeout:
+                    break
+                else:
+                    self.stop_event.wait(self.poll_interval)
+        except BaseException as error:
+            self.fail(error)
+        finally:
+            self.html_queue.put(_DONE)
+
+    def extract_stage(self):
+        """
+        Turns queued HTML into visible text for the index stage.
+        """
+        stats = self.stats['extract']
+        try:
+            while True:
+                item = self.html_queue.get()
+                if item is _DONE:
+                    break
+                if self.errors:
+                    continue  # Another stage failed; only wait for the end marker
+                url, html = item
+                started = time.perf_counter()
+                text = extract_text(html)
+                elapsed = time.perf_counter() - started
+                if text:
+                    self.text_queue.put(text)  # Blocks while index is behind
+                    stats.record(1, elapsed)
+                    self.stats['index'].observe_queue(self.text_queue.qsize())
+                else:
+                    print(f"No visible text found: {url}")
+                    stats.record(0, elapsed)
+        except BaseException as error:
+            self.fail(error)
+            self.drain(self.html_queue)
+        finally:
+            self.text_queue.put(_DONE)
+
+    def index_stage(self):
+        """
+        Adds queued text to the search engine in batches of batch_size.
+        """
+        stats = self.stats['index']
+        batch = []
+        finished = False  # Whether the end marker has been taken off the queue
+        try:
+            while True:
+                item = self.text_queue.get()
+                finished = item is _DONE
+                if item is not _DONE and not self.errors:
+                    batch.append(item)
+                if batch and not self.errors and (item is _DONE or len(batch) >= self.batch_size):
+                    started = time.perf_counter()
+                    self.search_engine.add_documents(batch)
+                    stats.record(len(batch), time.perf_counter() - started)
+                    batch = []
+                if item is _DONE:
+                    break
+        except BaseException as error:
+            self.fail(error)
+            if not finished:
+                self.drain(self.text_queue)
+
+    def run(self):
+        """
+        Runs all stages to completion and rebuilds the inverted index.
+        Re-raises the first exception raised by any stage. With report_interval
+        set, the current throughput and queue depths are printed while it runs.
+        """
+        threads = [
+            threading.Thread(target=self.fetch_stage, name='fetch'),
+            threading.Thread(target=self.extract_stage, name='extract'),
+            threading.Thread(target=self.index_stage, name='index'),
+        ]
+        reporter = None
+        if self.report_interval:
+            reporter = threading.Thread(target=self.report_stage, name='report', daemon=True)
+        for thread in threads:
+            thread.start()
+        if reporter:
+            reporter.start()
+        for thread in threads:
+            thread.join()
+        self.finished_event.set()
+        if reporter:
+            reporter.join()
+
+        if self.errors:
+            raise self.errors[0]
+        if self.search_engine.document_id_counter > 0:
+            self.search_engine.generate_inverted_index()
+
+    def report_stage(self):
+        """
+        Prints a report every report_interval seconds until the stages finish.
+        """
+        while not self.finished_event.wait(self.report_interval):
+            self.report()
+
+    def stop(self):
+        """
+        Asks the fetch stage to finish; queued pages are still indexed.
+        """
+        self.stop_event.set()
+
+    def queue_depths(self):
+        """
+        Current number of items waiting for each stage; safe to call while running.
+        """
+        return {'extract': self.html_queue.qsize(), 'index': self.text_queue.qsize()}
+
+    def report(self):
+        """
+        Prints per-stage throughput and the current and deepest input queue.
+        The fetch stage reads from MongoDB rather than a queue.
+        """
+        depths = self.queue_depths()
+        print(f"{'Stage':<10}{'Items':>8}{'Busy (s)':>12}{'Items/s':>12}{'Queue':>8}{'Max queue':>12}")
+        for name, stats in self.stats.items():
+            queue_depth = depths.get(name, '-')
+            max_queue_depth = stats.max_queue_depth if name in depths else '-'
+            print(f"{name:<10}{stats.items:>8}{stats.busy_seconds:>12.3f}{stats.throughput():>12.1f}"
+                  f"{queue_depth:>8}{max_queue_depth:>12}")
+
+
+if __name__ == '__main__':
+    # Run Assignment3/web_crawler_Q5.py at the same time to index pages as they are crawled
+    crawler_db = connectCrawlerDataBase()
+    search_engine = SearchEngine()
+    pipeline = CrawlIndexPipeline(search_engine, crawler_db['pages'], report_interval=5.0)
+    pipeline.run()
+    print("\nFinal:")
+    pipeline.report()
+
+    print("\nQuery: computer science faculty")
+    search_engine.rank_documents("computer science faculty")
@@ -0,0 +1,168 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Metric names shared by the indexer, search engine, crawler and benchmark harness
+PARSE = 'parse'
+TOKENISE = 'tokenise'
+VECTORISE = 'vectorise'  # Tokenising plus n-gram vocabulary and TF-IDF weighting
+SCORE = 'score'
+PHRASE = 'phrase'  # Intersecting positions for exact phrase matches
+DB = 'db'
+FETCH = 'fetch'
+
+# Counter names for the volume of work behind the timers
+PAGES_FETCHED = 'pages_fetched'
+DOCUMENTS_TOKENISED = 'documents_tokenised'
+DB_ROUND_TRIPS = 'db_round_trips'
+DB_FAILURES = 'db_failures'
+QUERIES_SCORED = 'queries_scored'
+
+
+class Metrics:
+    """
+    Opt-in timers and counters for the project's hot paths.
+
+    Recording is off unless enable() is called or the IR_METRICS environment
+    variable is set to 1, so instrumented code pays only an attribute check
+    when nobody is measuring. With IR_METRICS_OUTPUT set as well, the metrics
+    are written to that JSON file when the program exits.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = {}  # Name -> {"calls", "seconds", "max_seconds"}
+        self.counters = {}  # Name -> count
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+
+    def record(self, name, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            timer["calls"] += 1
+            timer["seconds"] += seconds
+            if seconds > timer["max_seconds"]:
+                timer["max_seconds"] = seconds
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Times the enclosed block under name.
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """
+        Decorator that times every call of the decorated function under name.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def timed_function(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return timed_function
+        return decorator
+
+    def wrap(self, owner, attribute, name):
+        """
+        Replaces owner.attribute with a version timed under name and returns the original.
+        """
+        original = getattr(owner, attribute)
+        setattr(owner, attribute, self.timed(name)(original))
+        return original
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timers": {name: dict(timer) for name, timer in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def export_json(self, path):
+        with open(path, 'w') as output:
+            json.dump(self.snapshot(), output, indent=2, sort_keys=True)
+
+
+class DatabaseListener:
+    """
+    pymongo command listener that times every MongoDB round trip as DB.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if self.metrics.enabled:
+            self.metrics.record(DB, event.duration_micros / 1e6)
+            self.metrics.count(DB_ROUND_TRIPS)
+
+    def failed(self, event):
+        if self.metrics.enabled:
+            self.metrics.record(DB, event.duration_micros / 1e6)
+            self.metrics.count(DB_ROUND_TRIPS)
+            self.metrics.count(DB_FAILURES)
+
+
+def monitor_mongodb():
+    """
+    Registers DatabaseListener with pymongo; only clients created afterwards are monitored.
+    """
+    from pymongo import monitoring
+
+    class Listener(DatabaseListener, monitoring.CommandListener):
+        pass
+
+    monitoring.register(Listener(metrics))
+
+
+def compare(baseline, current, tolerance=0.2, min_seconds=0.001):
+    """
+    Returns (name, baseline seconds, current seconds) for every timing in current
+    that is more than tolerance slower than in baseline. Both arguments map names
+    to seconds; baseline timings under min_seconds are too noisy to compare.
+    """
+    regressions = []
+    for name, seconds in sorted(current.items()):
+        previous = baseline.get(name)
+        if previous and previous >= min_seconds and seconds > previous * (1 + tolerance):
+            regressions.append((name, previous, seconds))
+    return regressions
+
+
+metrics = Metrics(enabled=os.environ.get('IR_METRICS') == '1')
+
+# Environment opt-in also times real MongoDB round trips and writes the metrics out on exit
+if metrics.enabled:
+    monitor_mongodb()
+    if os.environ.get('IR_METRICS_OUTPUT'):
+        atexit.register(metrics.export_json, os.environ['IR_METRICS_OUTPUT'])